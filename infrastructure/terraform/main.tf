@@ -126,6 +126,9 @@ module "glue" {
   glue_version          = "4.0"
   worker_type           = var.glue_worker_type
   number_of_workers     = var.glue_number_of_workers
+  comet_jar_s3_path     = var.glue_comet_jar_s3_path
+  
+  silver_to_gold_glue_version = var.glue_silver_to_gold_version
   
   tags = local.common_tags
 }
@@ -39,12 +39,38 @@ resource "aws_glue_job" "bronze_to_silver" {
   tags = var.tags
 }
 
+# Optional Apache Comet (DataFusion-native Parquet scan and execution) for
+# the Silver to Gold job; enabled only when a Comet jar path is provided.
+# Glue passes a single --conf argument, so further settings are chained
+# inside its value.
+locals {
+  comet_conf = join(" --conf ", [
+    "spark.plugins=org.apache.spark.CometPlugin",
+    "spark.shuffle.manager=org.apache.spark.sql.comet.execution.shuffle.CometShuffleManager",
+    "spark.comet.scan.enabled=true",
+    "spark.comet.exec.enabled=true",
+    "spark.comet.exec.shuffle.enabled=true",
+    "spark.memory.offHeap.enabled=true",
+    "spark.memory.offHeap.size=${var.comet_off_heap_size}",
+  ])
+  
+  # Comet needs Spark 3.4+, so this job can run a newer Glue version than
+  # bronze_to_silver
+  silver_to_gold_glue_version = coalesce(var.silver_to_gold_glue_version, var.glue_version)
+  
+  comet_arguments = var.comet_jar_s3_path == "" ? {} : {
+    "--extra-jars"      = var.comet_jar_s3_path
+    "--user-jars-first" = "true"
+    "--conf"            = local.comet_conf
+  }
+}
+
 # Silver to Gold ETL Job
 resource "aws_glue_job" "silver_to_gold" {
   name     = "${var.name_prefix}-silver-to-gold"
   role_arn = var.glue_role_arn
   
-  glue_version      = var.glue_version
+  glue_version      = local.silver_to_gold_glue_version
   worker_type       = var.worker_type
   number_of_workers = var.number_of_workers
   
@@ -54,7 +80,7 @@ resource "aws_glue_job" "silver_to_gold" {
     python_version  = "3"
   }
   
-  default_arguments = {
+  default_arguments = merge({
     "--job-language"                     = "python"
     "--job-bookmark-option"              = "job-bookmark-enable"
     "--enable-metrics"                   = "true"
@@ -62,12 +88,22 @@ resource "aws_glue_job" "silver_to_gold" {
     "--enable-glue-datacatalog"          = "true"
     "--DATA_BUCKET"                      = var.data_bucket_name
     "--ENVIRONMENT"                      = var.environment
-  }
+    "--REPARTITION_GOLD_OUTPUTS"         = tostring(var.repartition_gold_outputs)
+    "--LAB_VALUES_FLOAT32"               = tostring(var.lab_values_float32)
+    "--SALT_AE_JOIN"                     = tostring(var.salt_ae_join)
+  }, local.comet_arguments)
   
   execution_property {
     max_concurrent_runs = 1
   }
   
+  lifecycle {
+    precondition {
+      condition     = var.comet_jar_s3_path == "" || tonumber(split(".", local.silver_to_gold_glue_version)[0]) >= 5
+      error_message = "comet_jar_s3_path requires Glue 5.0 or later (Spark 3.4+); set silver_to_gold_glue_version accordingly."
+    }
+  }
+  
   tags = var.tags
 }
 
@@ -106,3 +142,21 @@ resource "aws_glue_crawler" "silver" {
   
   tags = var.tags
 }
+
+# Glue Crawler for Gold layer
+resource "aws_glue_crawler" "gold" {
+  name          = "${var.name_prefix}-gold-crawler"
+  role          = var.glue_role_arn
+  database_name = aws_glue_catalog_database.main.name
+  
+  s3_target {
+    path = "s3://${var.data_bucket_name}/gold/"
+  }
+  
+  schema_change_policy {
+    delete_behavior = "LOG"
+    update_behavior = "UPDATE_IN_DATABASE"
+  }
+  
+  tags = var.tags
+}
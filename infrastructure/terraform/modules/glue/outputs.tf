@@ -19,3 +19,7 @@ output "bronze_crawler_name" {
 output "silver_crawler_name" {
   value = aws_glue_crawler.silver.name
 }
+
+output "gold_crawler_name" {
+  value = aws_glue_crawler.gold.name
+}
@@ -35,6 +35,40 @@ variable "number_of_workers" {
   default = 2
 }
 
+# Silver to Gold job flags
+variable "repartition_gold_outputs" {
+  type    = bool
+  default = true
+}
+
+variable "lab_values_float32" {
+  type    = bool
+  default = false
+}
+
+variable "salt_ae_join" {
+  type    = bool
+  default = false
+}
+
+# Glue version for the Silver to Gold job only; null uses glue_version
+variable "silver_to_gold_glue_version" {
+  type    = string
+  default = null
+}
+
+# Apache Comet jar for the Silver to Gold job; empty disables Comet.
+# Comet needs Spark 3.4+, so silver_to_gold_glue_version must be 5.0+.
+variable "comet_jar_s3_path" {
+  type    = string
+  default = ""
+}
+
+variable "comet_off_heap_size" {
+  type    = string
+  default = "4g"
+}
+
 variable "tags" {
   type    = map(string)
   default = {}
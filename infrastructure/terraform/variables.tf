@@ -64,6 +64,18 @@ variable "glue_number_of_workers" {
   default     = 2
 }
 
+variable "glue_silver_to_gold_version" {
+  description = "Glue version for the Silver to Gold job (null uses the shared Glue version)"
+  type        = string
+  default     = null
+}
+
+variable "glue_comet_jar_s3_path" {
+  description = "S3 path of an Apache Comet jar for the Silver to Gold job (empty disables Comet; requires glue_silver_to_gold_version 5.0+)"
+  type        = string
+  default     = ""
+}
+
 # =============================================================================
 # REDSHIFT CONFIGURATION
 # =============================================================================
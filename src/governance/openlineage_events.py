@@ -20,11 +20,27 @@ WHAT THIS DEMONSTRATES:
 """
 
 import json
+import sys
 import uuid
+from collections import deque
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from enum import Enum
-from typing import Any, Optional
+from itertools import count
+from typing import Any, Callable, Optional
+
+# Facet builders reuse these exact string objects instead of repeating the
+# literals, so every event shares one copy of each URL.
+_PRODUCER = sys.intern("https://github.com/Wrek34/clinical-trial-data-platform")
+_FACET_SPEC = "https://openlineage.io/spec/facets/1-0-0/"
+_SCHEMA_FACET_URL = sys.intern(_FACET_SPEC + "SchemaDatasetFacet.json")
+_DATA_QUALITY_FACET_URL = sys.intern(
+    _FACET_SPEC + "DataQualityMetricsInputDatasetFacet.json"
+)
+_SQL_FACET_URL = sys.intern(_FACET_SPEC + "SqlJobFacet.json")
+_SOURCE_CODE_FACET_URL = sys.intern(_FACET_SPEC + "SourceCodeLocationJobFacet.json")
+_NOMINAL_TIME_FACET_URL = sys.intern(_FACET_SPEC + "NominalTimeRunFacet.json")
+_ERROR_FACET_URL = sys.intern(_FACET_SPEC + "ErrorMessageRunFacet.json")
 
 
 class EventType(Enum):
@@ -68,8 +84,8 @@ class Dataset:
     def with_schema(self, fields: list[DatasetField]) -> 'Dataset':
         """Add schema facet."""
         self.facets["schema"] = {
-            "_producer": "https://github.com/Wrek34/clinical-trial-data-platform",
-            "_schemaURL": "https://openlineage.io/spec/facets/1-0-0/SchemaDatasetFacet.json",
+            "_producer": _PRODUCER,
+            "_schemaURL": _SCHEMA_FACET_URL,
             "fields": [f.to_dict() for f in fields]
         }
         return self
@@ -77,8 +93,8 @@ class Dataset:
     def with_data_quality(self, metrics: dict) -> 'Dataset':
         """Add data quality metrics facet."""
         self.facets["dataQuality"] = {
-            "_producer": "https://github.com/Wrek34/clinical-trial-data-platform",
-            "_schemaURL": "https://openlineage.io/spec/facets/1-0-0/DataQualityMetricsInputDatasetFacet.json",
+            "_producer": _PRODUCER,
+            "_schemaURL": _DATA_QUALITY_FACET_URL,
             **metrics
         }
         return self
@@ -86,7 +102,7 @@ class Dataset:
     def with_lineage_info(self, source_system: str, ingestion_time: str) -> 'Dataset':
         """Add custom lineage info facet."""
         self.facets["lineageInfo"] = {
-            "_producer": "https://github.com/Wrek34/clinical-trial-data-platform",
+            "_producer": _PRODUCER,
             "sourceSystem": source_system,
             "ingestionTime": ingestion_time
         }
@@ -116,8 +132,8 @@ class Job:
     def with_sql(self, query: str) -> 'Job':
         """Add SQL facet for jobs that execute SQL."""
         self.facets["sql"] = {
-            "_producer": "https://github.com/Wrek34/clinical-trial-data-platform",
-            "_schemaURL": "https://openlineage.io/spec/facets/1-0-0/SqlJobFacet.json",
+            "_producer": _PRODUCER,
+            "_schemaURL": _SQL_FACET_URL,
             "query": query
         }
         return self
@@ -125,8 +141,8 @@ class Job:
     def with_source_code(self, location: str, version: str) -> 'Job':
         """Add source code location facet."""
         self.facets["sourceCodeLocation"] = {
-            "_producer": "https://github.com/Wrek34/clinical-trial-data-platform",
-            "_schemaURL": "https://openlineage.io/spec/facets/1-0-0/SourceCodeLocationJobFacet.json",
+            "_producer": _PRODUCER,
+            "_schemaURL": _SOURCE_CODE_FACET_URL,
             "type": "git",
             "url": location,
             "version": version
@@ -156,8 +172,8 @@ class Run:
     def with_nominal_time(self, start: str, end: str = None) -> 'Run':
         """Add nominal time facet."""
         facet = {
-            "_producer": "https://github.com/Wrek34/clinical-trial-data-platform",
-            "_schemaURL": "https://openlineage.io/spec/facets/1-0-0/NominalTimeRunFacet.json",
+            "_producer": _PRODUCER,
+            "_schemaURL": _NOMINAL_TIME_FACET_URL,
             "nominalStartTime": start
         }
         if end:
@@ -168,8 +184,8 @@ class Run:
     def with_error(self, message: str, stack_trace: str = None) -> 'Run':
         """Add error facet for failed runs."""
         facet = {
-            "_producer": "https://github.com/Wrek34/clinical-trial-data-platform",
-            "_schemaURL": "https://openlineage.io/spec/facets/1-0-0/ErrorMessageRunFacet.json",
+            "_producer": _PRODUCER,
+            "_schemaURL": _ERROR_FACET_URL,
             "message": message,
             "programmingLanguage": "python"
         }
@@ -187,7 +203,7 @@ class Run:
     ) -> 'Run':
         """Add processing statistics facet."""
         self.facets["processingStats"] = {
-            "_producer": "https://github.com/Wrek34/clinical-trial-data-platform",
+            "_producer": _PRODUCER,
             "rowsRead": rows_read,
             "rowsWritten": rows_written,
             "bytesRead": bytes_read,
@@ -210,7 +226,7 @@ class OpenLineageEvent:
     This is the standard format consumed by Marquez, DataHub, and other
     lineage tools. Each event represents a state change in a job run.
     """
-    event_type: EventType
+    event_type: EventType | str
     event_time: str
     producer: str
     schema_url: str
@@ -218,10 +234,17 @@ class OpenLineageEvent:
     run: Run
     inputs: list  # List of Dataset
     outputs: list  # List of Dataset
+    # Position in the emitter's run; not part of the OpenLineage payload
+    sequence: int = 0
+    
+    def __post_init__(self):
+        # Resolve the enum once so serialization reads a plain string
+        if isinstance(self.event_type, EventType):
+            self.event_type = self.event_type.value
     
     def to_dict(self) -> dict:
         return {
-            "eventType": self.event_type.value,
+            "eventType": self.event_type,
             "eventTime": self.event_time,
             "producer": self.producer,
             "schemaURL": self.schema_url,
@@ -235,6 +258,10 @@ class OpenLineageEvent:
         return json.dumps(self.to_dict(), indent=2)
 
 
+# Reference to a Dataset registered with an emitter: (namespace, name)
+DatasetRef = tuple[str, str]
+
+
 class OpenLineageEmitter:
     """
     Emits OpenLineage events for pipeline observability.
@@ -258,28 +285,94 @@ class OpenLineageEmitter:
         
         # Or failure
         emitter.emit_fail(error_message="Schema validation failed")
+    
+    Long-running jobs can bound memory with max_events (keeps only the most
+    recent events) or pass a stream_writer callable that receives each event
+    as it is emitted instead of buffering it.
+    
+    Datasets that appear in several events of a run should be registered
+    once with emitter.register_dataset(namespace, name, build) and referenced
+    by (namespace, name) tuple. The registry never hands out its instances:
+    update_dataset() runs its builder on a copy and swaps that in, so events
+    already emitted keep the facets they were emitted with. Unregistered
+    references raise KeyError.
     """
     
-    PRODUCER = "https://github.com/Wrek34/clinical-trial-data-platform"
-    SCHEMA_URL = "https://openlineage.io/spec/1-0-5/OpenLineage.json"
+    PRODUCER = _PRODUCER
+    SCHEMA_URL = sys.intern("https://openlineage.io/spec/1-0-5/OpenLineage.json")
     
     def __init__(
         self, 
         namespace: str, 
         job_name: str,
         source_code_location: str = None,
-        source_code_version: str = None
+        source_code_version: str = None,
+        max_events: int = None,
+        stream_writer: Callable[[OpenLineageEvent], None] = None
     ):
         self.namespace = namespace
         self.job_name = job_name
         self.run = Run()
-        self.events: list[OpenLineageEvent] = []
+        self.events: deque[OpenLineageEvent] = deque(maxlen=max_events)
+        self._sequence = count()
+        self.stream_writer = stream_writer
+        self.datasets: dict[DatasetRef, Dataset] = {}
         
         # Create job with optional facets
         self.job = Job(namespace=namespace, name=job_name)
         if source_code_location and source_code_version:
             self.job.with_source_code(source_code_location, source_code_version)
     
+    def register_dataset(
+        self,
+        namespace: str,
+        name: str,
+        build: Callable[[Dataset], Any] = None
+    ) -> DatasetRef:
+        """Register a shared Dataset, optionally built by build(dataset)."""
+        key = (namespace, name)
+        if key in self.datasets:
+            raise ValueError(f"Dataset {key} is already registered")
+        ds = Dataset(namespace=namespace, name=name)
+        if build is not None:
+            build(ds)
+        self.datasets[key] = ds
+        return key
+    
+    def update_dataset(
+        self,
+        namespace: str,
+        name: str,
+        build: Callable[[Dataset], Any]
+    ) -> DatasetRef:
+        """Copy-on-write update: run build on a copy and swap it in."""
+        key = (namespace, name)
+        current = self._lookup_dataset(key)
+        updated = Dataset(
+            namespace=namespace,
+            name=name,
+            facets=dict(current.facets)
+        )
+        build(updated)
+        self.datasets[key] = updated
+        return key
+    
+    def _lookup_dataset(self, key: DatasetRef) -> Dataset:
+        """Strict registry lookup."""
+        try:
+            return self.datasets[key]
+        except KeyError:
+            raise KeyError(
+                f"Dataset {key} is not registered; call register_dataset() first"
+            ) from None
+    
+    def _resolve_datasets(self, datasets: list[Dataset | DatasetRef]) -> list[Dataset]:
+        """Resolve (namespace, name) references against the registry."""
+        return [
+            d if isinstance(d, Dataset) else self._lookup_dataset(tuple(d))
+            for d in datasets
+        ]
+    
     def _get_event_time(self) -> str:
         """Get current time in ISO 8601 format with timezone."""
         return datetime.now(timezone.utc).isoformat()
@@ -287,36 +380,42 @@ class OpenLineageEmitter:
     def _create_event(
         self,
         event_type: EventType,
-        inputs: list[Dataset],
-        outputs: list[Dataset]
+        inputs: list[Dataset | DatasetRef],
+        outputs: list[Dataset | DatasetRef],
+        event_time: str = None
     ) -> OpenLineageEvent:
         """Create an OpenLineage event."""
         event = OpenLineageEvent(
             event_type=event_type,
-            event_time=self._get_event_time(),
+            event_time=event_time or self._get_event_time(),
             producer=self.PRODUCER,
             schema_url=self.SCHEMA_URL,
             job=self.job,
             run=self.run,
-            inputs=inputs,
-            outputs=outputs
+            inputs=self._resolve_datasets(inputs),
+            outputs=self._resolve_datasets(outputs),
+            sequence=next(self._sequence)
         )
-        self.events.append(event)
+        if self.stream_writer is not None:
+            self.stream_writer(event)
+        else:
+            self.events.append(event)
         return event
     
     def emit_start(
         self, 
-        inputs: list[Dataset], 
-        outputs: list[Dataset]
+        inputs: list[Dataset | DatasetRef], 
+        outputs: list[Dataset | DatasetRef]
     ) -> OpenLineageEvent:
         """Emit START event when job begins."""
-        self.run.with_nominal_time(self._get_event_time())
-        return self._create_event(EventType.START, inputs, outputs)
+        now = self._get_event_time()
+        self.run.with_nominal_time(now)
+        return self._create_event(EventType.START, inputs, outputs, event_time=now)
     
     def emit_running(
         self,
-        inputs: list[Dataset],
-        outputs: list[Dataset],
+        inputs: list[Dataset | DatasetRef],
+        outputs: list[Dataset | DatasetRef],
         progress_pct: float = None
     ) -> OpenLineageEvent:
         """Emit RUNNING event for long-running jobs (optional)."""
@@ -329,8 +428,8 @@ class OpenLineageEmitter:
     
     def emit_complete(
         self,
-        inputs: list[Dataset],
-        outputs: list[Dataset],
+        inputs: list[Dataset | DatasetRef],
+        outputs: list[Dataset | DatasetRef],
         rows_read: int = None,
         rows_written: int = None
     ) -> OpenLineageEvent:
@@ -341,8 +440,8 @@ class OpenLineageEmitter:
     
     def emit_fail(
         self,
-        inputs: list[Dataset],
-        outputs: list[Dataset],
+        inputs: list[Dataset | DatasetRef],
+        outputs: list[Dataset | DatasetRef],
         error_message: str,
         stack_trace: str = None
     ) -> OpenLineageEvent:
@@ -363,15 +462,21 @@ class OpenLineageEmitter:
         """
         Save events to S3 for consumption by lineage tools.
         
-        Events are organized by date and job for easy querying.
+        Events are organized by date and job for easy querying. Each object
+        is keyed on the event's sequence number within the run, which
+        survives max_events eviction, so repeated saves never overwrite an
+        earlier event's object with a different event.
         """
         import boto3
         
         s3 = boto3.client('s3')
         date_str = datetime.now().strftime("%Y/%m/%d")
         
-        for i, event in enumerate(self.events):
-            key = f"{prefix}/{self.job_name}/{date_str}/{self.run.run_id}_{i}.json"
+        for event in self.events:
+            key = (
+                f"{prefix}/{self.job_name}/{date_str}/"
+                f"{self.run.run_id}_{event.sequence}.json"
+            )
             s3.put_object(
                 Bucket=bucket,
                 Key=key,
@@ -0,0 +1,198 @@
+"""
+Unit tests for the OpenLineage event emitter.
+
+Uses moto to mock S3 for the save_to_s3 tests.
+"""
+
+import json
+import os
+
+import pytest
+from moto import mock_aws
+
+from src.governance.openlineage_events import DatasetField, OpenLineageEmitter
+
+
+@pytest.fixture
+def aws_credentials():
+    """Mock AWS credentials for moto."""
+    os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+    os.environ["AWS_SECURITY_TOKEN"] = "testing"
+    os.environ["AWS_SESSION_TOKEN"] = "testing"
+    os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+
+
+@pytest.fixture
+def s3_client(aws_credentials):
+    """Create mock S3 client with a lineage bucket."""
+    with mock_aws():
+        import boto3
+
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket="lineage-bucket")
+
+        yield client
+
+
+def saved_events(s3_client):
+    """Map each saved object key's sequence suffix to its event body."""
+    listing = s3_client.list_objects_v2(Bucket="lineage-bucket")
+    events = {}
+    for obj in listing.get("Contents", []):
+        sequence = int(obj["Key"].rsplit("_", 1)[1].removesuffix(".json"))
+        body = s3_client.get_object(Bucket="lineage-bucket", Key=obj["Key"])["Body"]
+        events[sequence] = json.loads(body.read())
+    return events
+
+
+class TestEventBuffer:
+    """Tests for bounded buffering and streaming of events."""
+
+    def test_unbounded_by_default(self):
+        """Test every event is kept when max_events is not set."""
+        emitter = OpenLineageEmitter(namespace="test", job_name="job")
+
+        for _ in range(5):
+            emitter.emit_running(inputs=[], outputs=[])
+
+        assert len(emitter.events) == 5
+
+    def test_max_events_evicts_oldest(self):
+        """Test a bounded emitter keeps only the most recent events."""
+        emitter = OpenLineageEmitter(namespace="test", job_name="job", max_events=2)
+
+        emitter.emit_start(inputs=[], outputs=[])
+        for _ in range(3):
+            emitter.emit_running(inputs=[], outputs=[])
+        emitter.emit_complete(inputs=[], outputs=[])
+
+        assert [e.event_type for e in emitter.events] == ["RUNNING", "COMPLETE"]
+        assert [e.sequence for e in emitter.events] == [3, 4]
+
+    def test_stream_writer_receives_events_unbuffered(self):
+        """Test a stream_writer gets each event and nothing is buffered."""
+        written = []
+        emitter = OpenLineageEmitter(
+            namespace="test", job_name="job", stream_writer=written.append
+        )
+
+        emitter.emit_start(inputs=[], outputs=[])
+        emitter.emit_complete(inputs=[], outputs=[])
+
+        assert [e.event_type for e in written] == ["START", "COMPLETE"]
+        assert [e.sequence for e in written] == [0, 1]
+        assert len(emitter.events) == 0
+
+    def test_sequence_not_in_payload(self):
+        """Test the sequence number stays out of the OpenLineage payload."""
+        emitter = OpenLineageEmitter(namespace="test", job_name="job")
+
+        event = emitter.emit_start(inputs=[], outputs=[])
+
+        assert "sequence" not in event.to_dict()
+
+
+class TestSaveToS3:
+    """Tests for saving buffered events to S3."""
+
+    def test_keys_follow_sequence(self, s3_client):
+        """Test each object is keyed on its event's sequence number."""
+        emitter = OpenLineageEmitter(namespace="test", job_name="job")
+
+        emitter.emit_start(inputs=[], outputs=[])
+        emitter.emit_complete(inputs=[], outputs=[])
+        emitter.save_to_s3("lineage-bucket")
+
+        events = saved_events(s3_client)
+        assert {k: v["eventType"] for k, v in events.items()} == {
+            0: "START",
+            1: "COMPLETE",
+        }
+
+    def test_save_after_eviction_does_not_overwrite(self, s3_client):
+        """Test a second save after eviction leaves earlier objects intact."""
+        emitter = OpenLineageEmitter(namespace="test", job_name="job", max_events=2)
+
+        emitter.emit_start(inputs=[], outputs=[])
+        emitter.emit_running(inputs=[], outputs=[])
+        emitter.save_to_s3("lineage-bucket")
+
+        emitter.emit_running(inputs=[], outputs=[])
+        emitter.emit_complete(inputs=[], outputs=[])
+        emitter.save_to_s3("lineage-bucket")
+
+        events = saved_events(s3_client)
+        assert {k: v["eventType"] for k, v in events.items()} == {
+            0: "START",
+            1: "RUNNING",
+            2: "RUNNING",
+            3: "COMPLETE",
+        }
+
+
+class TestDatasetRegistry:
+    """Tests for the shared, copy-on-write Dataset registry."""
+
+    def test_register_and_reference(self):
+        """Test registered datasets resolve by (namespace, name) reference."""
+        emitter = OpenLineageEmitter(namespace="test", job_name="job")
+        ref = emitter.register_dataset(
+            "s3://bucket",
+            "silver/dm",
+            lambda d: d.with_schema([DatasetField("USUBJID", "string")]),
+        )
+
+        event = emitter.emit_start(inputs=[], outputs=[ref])
+
+        output = event.to_dict()["outputs"][0]
+        assert output["name"] == "silver/dm"
+        assert output["facets"]["schema"]["fields"][0]["name"] == "USUBJID"
+
+    def test_unregistered_reference_raises(self):
+        """Test a mistyped reference fails instead of emitting an empty dataset."""
+        emitter = OpenLineageEmitter(namespace="test", job_name="job")
+        emitter.register_dataset("s3://bucket", "silver/dm")
+
+        with pytest.raises(KeyError):
+            emitter.emit_start(inputs=[("s3://bucket", "silver/mistyped")], outputs=[])
+
+        assert len(emitter.events) == 0
+
+    def test_duplicate_registration_raises(self):
+        """Test registering the same dataset twice is rejected."""
+        emitter = OpenLineageEmitter(namespace="test", job_name="job")
+        emitter.register_dataset("s3://bucket", "silver/dm")
+
+        with pytest.raises(ValueError):
+            emitter.register_dataset("s3://bucket", "silver/dm")
+
+    def test_update_does_not_change_emitted_events(self):
+        """Test an update after emit leaves the earlier event's facets alone."""
+        emitter = OpenLineageEmitter(namespace="test", job_name="job")
+        ref = emitter.register_dataset(
+            "s3://bucket",
+            "silver/dm",
+            lambda d: d.with_schema([DatasetField("USUBJID", "string")]),
+        )
+
+        start = emitter.emit_start(inputs=[], outputs=[ref])
+        emitter.update_dataset(
+            *ref, lambda d: d.with_data_quality({"rowCount": 10})
+        )
+        complete = emitter.emit_complete(inputs=[], outputs=[ref])
+
+        start_facets = start.to_dict()["outputs"][0]["facets"]
+        complete_facets = complete.to_dict()["outputs"][0]["facets"]
+        assert "dataQuality" not in start_facets
+        assert complete_facets["dataQuality"]["rowCount"] == 10
+        assert "schema" in complete_facets
+
+    def test_update_unregistered_raises(self):
+        """Test updating a dataset that was never registered fails."""
+        emitter = OpenLineageEmitter(namespace="test", job_name="job")
+
+        with pytest.raises(KeyError):
+            emitter.update_dataset(
+                "s3://bucket", "silver/dm", lambda d: d.with_data_quality({})
+            )
@@ -11,24 +11,52 @@ import json
 import logging
 import os
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from typing import Any
 from urllib.parse import unquote_plus
 
-import boto3
+from boto3.s3.transfer import TransferConfig
+from boto3.session import Session
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(os.environ.get("LOG_LEVEL", "INFO"))
 
-# Initialize AWS clients
-s3_client = boto3.client("s3")
+# Initialize AWS clients once per container so warm invocations reuse the
+# client and its kept-alive connection pool. Functions below must only use
+# this module-level client.
+# Records in one event are processed concurrently, and each large-file copy
+# runs its own part-copy threads; the pool must cover every worker running a
+# multipart copy at once or connections queue ("Connection pool is full").
+MAX_RECORD_WORKERS = 8
+MULTIPART_COPY_CONCURRENCY = 4
+S3_POOL_CONNECTIONS = max(
+    MAX_RECORD_WORKERS * MULTIPART_COPY_CONCURRENCY,
+    int(os.environ.get("S3_POOL", "16"))
+)
+session = Session()
+s3_client = session.client(
+    "s3",
+    config=Config(
+        tcp_keepalive=True,
+        max_pool_connections=S3_POOL_CONNECTIONS,
+        retries={"mode": "standard", "max_attempts": 3}
+    )
+)
 
 # Environment variables
 DATA_BUCKET = os.environ.get("DATA_BUCKET")
 ENVIRONMENT = os.environ.get("ENVIRONMENT", "dev")
 
+# Files at or above this size are copied with parallel multipart UploadPartCopy
+MULTIPART_COPY_THRESHOLD = 100 * 1024 * 1024  # 100MB
+
+# Accepted landing file extensions (lowercase, without the dot)
+_VALID_EXT = frozenset({"csv", "parquet", "json", "xml"})
+
 
 class IngestionError(Exception):
     """Custom exception for ingestion errors."""
@@ -49,21 +77,48 @@ def handler(event: dict, context: Any) -> dict:
     Returns:
         dict: Processing result with status and details
     """
-    logger.info(f"Processing event: {json.dumps(event)}")
+    # Full event dumps are debug output; skip serializing them at INFO
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Processing event: {json.dumps(event)}")
+    else:
+        logger.info(f"Processing event with {len(event.get('Records', []))} record(s)")
     
+    records = event.get("Records", [])
     results = []
+    lineage_records = []
     
-    for record in event.get("Records", []):
+    # One clock read per invocation, shared by metadata, Bronze and lineage paths
+    now = datetime.now(timezone.utc)
+    
+    if records:
+        # S3 calls release the GIL, so records overlap their network I/O
+        with ThreadPoolExecutor(max_workers=min(MAX_RECORD_WORKERS, len(records))) as executor:
+            futures = [executor.submit(process_record, record, now) for record in records]
+            
+            # Collect in submission order so results line up with Records
+            for record, future in zip(records, futures):
+                try:
+                    result, lineage_record = future.result()
+                    results.append(result)
+                    lineage_records.append(lineage_record)
+                except Exception as e:
+                    logger.error(f"Error processing record: {str(e)}")
+                    results.append({
+                        "status": "error",
+                        "error": str(e),
+                        "record": record
+                    })
+    
+    # One lineage object per invocation instead of one PUT per record
+    if lineage_records:
         try:
-            result = process_record(record)
-            results.append(result)
+            write_lineage(lineage_records, now)
         except Exception as e:
-            logger.error(f"Error processing record: {str(e)}")
-            results.append({
-                "status": "error",
-                "error": str(e),
-                "record": record
-            })
+            logger.error(f"Error writing lineage: {str(e)}")
+            for result in results:
+                if result.get("status") == "success":
+                    result["status"] = "error"
+                    result["error"] = f"Lineage write failed: {str(e)}"
     
     # Determine overall status
     errors = [r for r in results if r.get("status") == "error"]
@@ -79,15 +134,19 @@ def handler(event: dict, context: Any) -> dict:
     }
 
 
-def process_record(record: dict) -> dict:
+def process_record(record: dict, now: datetime = None) -> tuple[dict, dict]:
     """
     Process a single S3 event record.
     
+    The lineage record is returned rather than written so the handler can
+    store all lineage for an invocation in a single S3 object.
+    
     Args:
         record: S3 event record
+        now: Ingestion time for the invocation (defaults to current UTC time)
         
     Returns:
-        dict: Processing result
+        tuple: Processing result and lineage record
     """
     # Extract S3 information
     bucket = record["s3"]["bucket"]["name"]
@@ -96,32 +155,33 @@ def process_record(record: dict) -> dict:
     
     logger.info(f"Processing file: s3://{bucket}/{key}")
     
+    # Determine domain and source from path
+    file_info = parse_file_path(key)
+    
     # Validate file
-    validation_result = validate_file(bucket, key, size)
+    validation_result = validate_file(bucket, key, size, file_info["extension"])
     if not validation_result["valid"]:
         raise IngestionError(f"Validation failed: {validation_result['reason']}")
     
-    # Determine domain and source from path
-    file_info = parse_file_path(key)
+    if now is None:
+        now = datetime.now(timezone.utc)
     
     # Generate metadata
-    metadata = generate_metadata(bucket, key, size, file_info)
+    metadata = generate_metadata(bucket, key, size, file_info, now)
     
     # Move to Bronze layer
-    bronze_key = move_to_bronze(bucket, key, file_info, metadata)
+    bronze_key = move_to_bronze(bucket, key, file_info, metadata, now)
     
-    # Write lineage record
-    write_lineage(metadata, bronze_key)
-    
-    return {
+    result = {
         "status": "success",
         "source_key": key,
         "bronze_key": bronze_key,
         "metadata": metadata
     }
+    return result, build_lineage_record(metadata, bronze_key)
 
 
-def validate_file(bucket: str, key: str, size: int) -> dict:
+def validate_file(bucket: str, key: str, size: int, extension: str = None) -> dict:
     """
     Validate an incoming file.
     
@@ -129,6 +189,7 @@ def validate_file(bucket: str, key: str, size: int) -> dict:
         bucket: S3 bucket name
         key: S3 object key
         size: File size in bytes
+        extension: Lowercase extension if already parsed from the key
         
     Returns:
         dict: Validation result with 'valid' bool and 'reason' if invalid
@@ -142,19 +203,22 @@ def validate_file(bucket: str, key: str, size: int) -> dict:
         return {"valid": False, "reason": "Empty file"}
     
     # Check file extension
-    valid_extensions = [".csv", ".parquet", ".json", ".xml"]
-    if not any(key.lower().endswith(ext) for ext in valid_extensions):
+    if extension is None:
+        extension = _file_extension(key)
+    if extension not in _VALID_EXT:
         return {"valid": False, "reason": f"Invalid file type: {key}"}
     
-    # Check if file exists and is readable
-    try:
-        s3_client.head_object(Bucket=bucket, Key=key)
-    except ClientError as e:
-        return {"valid": False, "reason": f"Cannot access file: {str(e)}"}
-    
+    # Existence is not probed here: S3 only emits the event once the object
+    # exists, and move_to_bronze reports a missing or unreadable source.
     return {"valid": True}
 
 
+def _file_extension(name: str) -> str:
+    """Return the lowercase extension of name, or "" if it has none."""
+    _, dot, ext = name.rpartition(".")
+    return ext.lower() if dot else ""
+
+
 def parse_file_path(key: str) -> dict:
     """
     Parse file path to extract domain and source information.
@@ -168,34 +232,29 @@ def parse_file_path(key: str) -> dict:
     Returns:
         dict: Parsed file information
     """
-    parts = key.split("/")
+    # The filename is the last path component whether or not the key matches
+    parts = key.split("/", 3)
+    filename = key.rpartition("/")[2]
     
     # Default values if path doesn't match expected format
-    file_info = {
-        "source": "unknown",
-        "domain": "unknown",
-        "filename": parts[-1] if parts else "unknown",
-        "extension": ""
-    }
-    
-    # Try to parse expected format
-    if len(parts) >= 4 and parts[0] == "landing":
-        file_info["source"] = parts[1]
-        file_info["domain"] = parts[2]
-        file_info["filename"] = parts[-1]
-    
-    # Extract extension
-    if "." in file_info["filename"]:
-        file_info["extension"] = file_info["filename"].split(".")[-1].lower()
+    source, domain = "unknown", "unknown"
+    if len(parts) == 4 and parts[0] == "landing":
+        source, domain = parts[1], parts[2]
     
-    return file_info
+    return {
+        "source": source,
+        "domain": domain,
+        "filename": filename,
+        "extension": _file_extension(filename)
+    }
 
 
 def generate_metadata(
     bucket: str, 
     key: str, 
     size: int, 
-    file_info: dict
+    file_info: dict,
+    now: datetime = None
 ) -> dict:
     """
     Generate metadata for the ingested file.
@@ -205,11 +264,13 @@ def generate_metadata(
         key: Source key
         size: File size
         file_info: Parsed file information
+        now: Ingestion time (defaults to current UTC time)
         
     Returns:
         dict: Metadata record
     """
-    now = datetime.now(timezone.utc)
+    if now is None:
+        now = datetime.now(timezone.utc)
     
     return {
         "ingestion_id": str(uuid.uuid4()),
@@ -232,7 +293,8 @@ def move_to_bronze(
     bucket: str, 
     source_key: str, 
     file_info: dict, 
-    metadata: dict
+    metadata: dict,
+    ingestion_time: datetime = None
 ) -> str:
     """
     Move file from landing zone to Bronze layer.
@@ -244,12 +306,13 @@ def move_to_bronze(
         source_key: Original file key
         file_info: Parsed file information
         metadata: Generated metadata
+        ingestion_time: Ingestion time; parsed from metadata if not given
         
     Returns:
         str: Bronze layer key
     """
     # Construct Bronze path with partitioning
-    ingestion_date = datetime.fromisoformat(metadata["ingestion_timestamp"])
+    ingestion_date = ingestion_time or datetime.fromisoformat(metadata["ingestion_timestamp"])
     
     bronze_key = (
         f"bronze/"
@@ -263,19 +326,39 @@ def move_to_bronze(
     
     # Copy to Bronze (preserving original)
     copy_source = {"Bucket": bucket, "Key": source_key}
+    object_metadata = {
+        "ingestion_id": metadata["ingestion_id"],
+        "source_system": file_info["source"],
+        "domain": file_info["domain"],
+        "ingestion_timestamp": metadata["ingestion_timestamp"]
+    }
     
-    s3_client.copy_object(
-        Bucket=DATA_BUCKET,
-        Key=bronze_key,
-        CopySource=copy_source,
-        Metadata={
-            "ingestion_id": metadata["ingestion_id"],
-            "source_system": file_info["source"],
-            "domain": file_info["domain"],
-            "ingestion_timestamp": metadata["ingestion_timestamp"]
-        },
-        MetadataDirective="REPLACE"
-    )
+    try:
+        if metadata.get("file_size_bytes", 0) >= MULTIPART_COPY_THRESHOLD:
+            # Large objects: managed copy splits into concurrent part copies
+            s3_client.copy(
+                CopySource=copy_source,
+                Bucket=DATA_BUCKET,
+                Key=bronze_key,
+                ExtraArgs={
+                    "Metadata": object_metadata,
+                    "MetadataDirective": "REPLACE"
+                },
+                Config=TransferConfig(
+                    multipart_threshold=8 * 1024 * 1024,
+                    max_concurrency=MULTIPART_COPY_CONCURRENCY
+                )
+            )
+        else:
+            s3_client.copy_object(
+                Bucket=DATA_BUCKET,
+                Key=bronze_key,
+                CopySource=copy_source,
+                Metadata=object_metadata,
+                MetadataDirective="REPLACE"
+            )
+    except ClientError as e:
+        raise IngestionError(f"Cannot access file: {str(e)}") from e
     
     logger.info(f"Copied to Bronze: s3://{DATA_BUCKET}/{bronze_key}")
     
@@ -285,15 +368,18 @@ def move_to_bronze(
     return bronze_key
 
 
-def write_lineage(metadata: dict, bronze_key: str) -> None:
+def build_lineage_record(metadata: dict, bronze_key: str) -> dict:
     """
-    Write lineage record for the ingested file.
+    Build the lineage record for an ingested file.
     
     Args:
         metadata: File metadata
         bronze_key: Bronze layer key
+        
+    Returns:
+        dict: Lineage record
     """
-    lineage_record = {
+    return {
         **metadata,
         "bronze_key": bronze_key,
         "bronze_bucket": DATA_BUCKET,
@@ -306,20 +392,36 @@ def write_lineage(metadata: dict, bronze_key: str) -> None:
         ],
         "downstream": []  # Will be updated by transformation jobs
     }
+
+
+def write_lineage(lineage_records: list[dict], now: datetime = None) -> str:
+    """
+    Write a batch of lineage records as one JSON Lines object.
+    
+    Args:
+        lineage_records: Lineage records for the invocation
+        now: Time used to partition the lineage key (defaults to current UTC time)
+        
+    Returns:
+        str: Lineage object key
+    """
+    if now is None:
+        now = datetime.now(timezone.utc)
     
     # Write lineage to metadata location
     lineage_key = (
         f"metadata/lineage/"
-        f"year={datetime.now().year}/"
-        f"month={datetime.now().month:02d}/"
-        f"{metadata['ingestion_id']}.json"
+        f"year={now.year}/"
+        f"month={now.month:02d}/"
+        f"batch_{uuid.uuid4()}.jsonl"
     )
     
     s3_client.put_object(
         Bucket=DATA_BUCKET,
         Key=lineage_key,
-        Body=json.dumps(lineage_record, indent=2),
-        ContentType="application/json"
+        Body="\n".join(json.dumps(r) for r in lineage_records),
+        ContentType="application/x-ndjson"
     )
     
-    logger.info(f"Lineage written: s3://{DATA_BUCKET}/{lineage_key}")
+    logger.info(f"Lineage written: s3://{DATA_BUCKET}/{lineage_key} ({len(lineage_records)} records)")
+    return lineage_key
@@ -213,6 +213,48 @@ class TestHandler:
         assert result["body"]["successful"] == 1
         assert result["body"]["failed"] == 0
     
+    def test_handler_multiple_records(self, s3_client, sample_s3_event):
+        """Test concurrent processing keeps one result per record, in order."""
+        from src.ingestion.lambda_handler import handler
+        
+        template = sample_s3_event["Records"][0]
+        records = []
+        for i in range(5):
+            key = f"landing/edc-system/dm/demographics_{i}.csv"
+            s3_client.put_object(Bucket="source-bucket", Key=key, Body=b"data")
+            records.append({
+                **template,
+                "s3": {
+                    "bucket": {"name": "source-bucket"},
+                    "object": {"key": key, "size": 4}
+                }
+            })
+        # One invalid record should not affect the others
+        records.append({
+            **template,
+            "s3": {
+                "bucket": {"name": "source-bucket"},
+                "object": {"key": "landing/edc-system/dm/bad.exe", "size": 4}
+            }
+        })
+        
+        result = handler({"Records": records}, None)
+        
+        assert result["statusCode"] == 207
+        assert result["body"]["processed"] == 6
+        assert result["body"]["successful"] == 5
+        assert result["body"]["failed"] == 1
+        source_keys = [r.get("source_key") for r in result["body"]["results"][:5]]
+        assert source_keys == [r["s3"]["object"]["key"] for r in records[:5]]
+        assert result["body"]["results"][5]["status"] == "error"
+        
+        # Lineage for the whole invocation lands in a single JSON Lines object
+        listing = s3_client.list_objects_v2(Bucket="test-bucket", Prefix="metadata/lineage/")
+        assert listing["KeyCount"] == 1
+        body = s3_client.get_object(Bucket="test-bucket", Key=listing["Contents"][0]["Key"])["Body"].read()
+        lineage = [json.loads(line) for line in body.decode().splitlines()]
+        assert [r["source_key"] for r in lineage] == source_keys
+    
     def test_handler_empty_event(self):
         """Test handler with empty event."""
         from src.ingestion.lambda_handler import handler
@@ -266,6 +308,78 @@ class TestMoveToBronze:
         # Verify file exists in Bronze
         response = s3_client.head_object(Bucket="test-bucket", Key=bronze_key)
         assert response is not None
+    
+    def test_large_file_uses_managed_copy(self, s3_client):
+        """Test that files over the multipart threshold use the managed copy."""
+        from boto3.s3.transfer import TransferConfig
+
+        from src.ingestion import lambda_handler
+        from src.ingestion.lambda_handler import (
+            MULTIPART_COPY_CONCURRENCY,
+            MULTIPART_COPY_THRESHOLD,
+            move_to_bronze,
+        )
+        
+        s3_client.put_object(
+            Bucket="source-bucket",
+            Key="landing/edc-system/lb/large.parquet",
+            Body=b"large data"
+        )
+        
+        file_info = {
+            "source": "edc-system",
+            "domain": "lb",
+            "filename": "large.parquet",
+            "extension": "parquet"
+        }
+        
+        metadata = {
+            "ingestion_id": "test-uuid-9999",
+            "ingestion_timestamp": "2024-01-15T12:00:00+00:00",
+            "file_size_bytes": MULTIPART_COPY_THRESHOLD
+        }
+        
+        with patch.object(
+            lambda_handler.s3_client, "copy", wraps=lambda_handler.s3_client.copy
+        ) as managed_copy:
+            bronze_key = move_to_bronze(
+                bucket="source-bucket",
+                source_key="landing/edc-system/lb/large.parquet",
+                file_info=file_info,
+                metadata=metadata
+            )
+        
+        managed_copy.assert_called_once()
+        config = managed_copy.call_args.kwargs["Config"]
+        assert isinstance(config, TransferConfig)
+        assert config.max_concurrency == MULTIPART_COPY_CONCURRENCY
+        
+        response = s3_client.head_object(Bucket="test-bucket", Key=bronze_key)
+        assert "test-uuid-9999" in response["Metadata"].values()
+    
+    def test_missing_source_raises_ingestion_error(self, s3_client):
+        """Test that a missing source object surfaces as IngestionError."""
+        from src.ingestion.lambda_handler import IngestionError, move_to_bronze
+        
+        file_info = {
+            "source": "edc-system",
+            "domain": "dm",
+            "filename": "missing.csv",
+            "extension": "csv"
+        }
+        
+        metadata = {
+            "ingestion_id": "test-uuid-5678",
+            "ingestion_timestamp": "2024-01-15T12:00:00+00:00"
+        }
+        
+        with pytest.raises(IngestionError, match="Cannot access file"):
+            move_to_bronze(
+                bucket="source-bucket",
+                source_key="landing/edc-system/dm/missing.csv",
+                file_info=file_info,
+                metadata=metadata
+            )
 
 
 # Fixtures for pytest discovery
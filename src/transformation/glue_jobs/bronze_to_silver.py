@@ -6,45 +6,164 @@ This script runs on AWS Glue and processes data from the Bronze layer,
 applies validation and standardization, and writes to the Silver layer.
 """
 
+import json
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+import boto3
 from awsglue.context import GlueContext
 from awsglue.job import Job
 from awsglue.transforms import *
 from awsglue.utils import getResolvedOptions
+from botocore.exceptions import ClientError
+from pyspark.conf import SparkConf
 from pyspark.context import SparkContext
 from pyspark.sql import functions as F
 from pyspark.sql.types import *
+from pyspark.storagelevel import StorageLevel
+
+try:
+    from pyspark.sql import Observation
+except ImportError:  # Spark < 3.3 (Glue 3.0 and earlier)
+    Observation = None
 
 # Initialize Glue context
 args = getResolvedOptions(sys.argv, ['JOB_NAME', 'DATA_BUCKET', 'ENVIRONMENT'])
-sc = SparkContext()
+# FAIR scheduling lets the independent per-domain jobs share the cluster
+sc = SparkContext(conf=SparkConf().set("spark.scheduler.mode", "FAIR"))
 glueContext = GlueContext(sc)
 spark = glueContext.spark_session
 job = Job(glueContext)
 job.init(args['JOB_NAME'], args)
 
+# Parquet scans: vectorized reads with filter and aggregate pushdown
+spark.conf.set("spark.sql.parquet.enableVectorizedReader", "true")
+spark.conf.set("spark.sql.parquet.filterPushdown", "true")
+spark.conf.set("spark.sql.parquet.aggregatePushdown", "true")
+
+# Silver files: zstd compresses better than snappy at similar CPU cost
+spark.conf.set("spark.sql.parquet.compression.codec", "zstd")
+SILVER_ROW_GROUP_BYTES = 64 * 1024 * 1024
+
 # Configuration
 DATA_BUCKET = args['DATA_BUCKET']
 ENVIRONMENT = args['ENVIRONMENT']
 BRONZE_PATH = f"s3://{DATA_BUCKET}/bronze/"
 SILVER_PATH = f"s3://{DATA_BUCKET}/silver/"
 
+s3_client = boto3.client("s3")
+
+# Bronze DM columns used by this job, typed as the synthetic generator writes
+# them. Parquet matches columns by name, so a subset schema is safe.
+DM_SCHEMA = StructType([
+    StructField("STUDYID", StringType()),
+    StructField("USUBJID", StringType()),
+    StructField("SUBJID", StringType()),
+    StructField("SITEID", StringType()),
+    StructField("AGE", LongType()),
+    StructField("AGEU", StringType()),
+    StructField("SEX", StringType()),
+    StructField("RACE", StringType()),
+    StructField("ETHNIC", StringType()),
+    StructField("COUNTRY", StringType()),
+    StructField("ARM", StringType()),
+    StructField("ARMCD", StringType()),
+    StructField("RFSTDTC", StringType()),
+    StructField("RFENDTC", StringType())
+])
+
+# CDISC controlled terminology for SEX: raw value -> standard code
+SEX_CODELIST = [
+    ("M", "M"), ("F", "F"), ("U", "U"),
+    ("m", "M"), ("f", "F"), ("u", "U")
+]
+
+def detect_bronze_format(prefix):
+    """Return "parquet" or "csv" from a single listing of a Bronze prefix."""
+    response = s3_client.list_objects_v2(Bucket=DATA_BUCKET, Prefix=prefix, MaxKeys=1000)
+    keys = [obj["Key"].lower() for obj in response.get("Contents", [])]
+    
+    if any(key.endswith(".parquet") for key in keys):
+        return "parquet"
+    if any(key.endswith(".csv") for key in keys):
+        return "csv"
+    raise FileNotFoundError(f"No parquet or csv files under s3://{DATA_BUCKET}/{prefix}")
+
+def read_bronze(domain, schema=None):
+    """
+    Read a Bronze domain with the reader that matches its files.
+    
+    Only files of the detected format are read (pathGlobFilter), so a prefix
+    holding both exports does not break the scan.
+    """
+    prefix = f"bronze/synthetic/{domain}/"
+    fmt = detect_bronze_format(prefix)
+    reader = spark.read.option("pathGlobFilter", f"*.{fmt}")
+    
+    if fmt == "parquet":
+        if schema is not None:
+            reader = reader.schema(schema)
+        return reader.parquet(f"{BRONZE_PATH}synthetic/{domain}/")
+    
+    # CSV columns are bound by header name; without inferSchema Spark does not
+    # run an inference pass, and a positional schema could misalign columns.
+    return reader.option("header", "true").csv(f"{BRONZE_PATH}synthetic/{domain}/")
+
+def write_silver(df, domain, single_file=False):
+    """
+    Write a cleaned domain to Silver and return its row count.
+    
+    The count is collected as an observed metric of the write itself, so the
+    DataFrame is scanned once instead of being recomputed by count(). On
+    Spark versions without Observation the DataFrame is persisted for the
+    write so the count reads the cached rows instead of Bronze.
+    
+    Small domains (single_file=True) are written as one file per processing
+    date; larger ones are capped at the cluster's default parallelism rather
+    than one file per shuffle partition.
+    """
+    if Observation is not None:
+        observation = Observation(f"{domain}_rows")
+        output = df.observe(observation, F.count(F.lit(1)).alias("rows"))
+    else:
+        output = df.persist(StorageLevel.MEMORY_AND_DISK)
+    
+    if single_file:
+        output = output.repartition(1, F.col("PROCESSING_DATE"))
+    else:
+        output = output.coalesce(sc.defaultParallelism)
+    
+    output_path = f"{SILVER_PATH}{domain}/"
+    output.write.mode("overwrite").option(
+        "parquet.block.size", SILVER_ROW_GROUP_BYTES
+    ).partitionBy("PROCESSING_DATE").parquet(output_path)
+    
+    if Observation is not None:
+        return observation.get["rows"]
+    
+    row_count = df.count()
+    df.unpersist()
+    return row_count
+
 def process_demographics():
     """Process DM (Demographics) domain."""
     print("Processing Demographics (DM)...")
     
     # Read from Bronze
-    dm_path = f"{BRONZE_PATH}synthetic/dm/"
+    df = read_bronze("dm", DM_SCHEMA)
     
-    try:
-        df = spark.read.parquet(dm_path)
-    except:
-        df = spark.read.option("header", "true").csv(dm_path)
+    # Small broadcast codelist: one hash probe both validates and standardizes SEX
+    sex_ct = spark.createDataFrame(SEX_CODELIST, ["SEX_RAW", "SEX_STD"])
     
-    # Standardization and validation
-    dm_clean = df.select(
+    # Basic validation runs on the raw columns so Parquet can push it into the
+    # scan and skip row groups
+    dm_clean = df.filter(
+        F.col("USUBJID").isNotNull() &
+        F.col("AGE").between(0, 120)
+    ).join(
+        F.broadcast(sex_ct), F.col("SEX") == F.col("SEX_RAW"), "inner"
+    ).select(
         F.col("STUDYID"),
         F.lit("DM").alias("DOMAIN"),
         F.col("USUBJID"),
@@ -52,7 +171,7 @@ def process_demographics():
         F.col("SITEID"),
         F.col("AGE").cast("int"),
         F.col("AGEU"),
-        F.upper(F.col("SEX")).alias("SEX"),
+        F.col("SEX_STD").alias("SEX"),
         F.upper(F.col("RACE")).alias("RACE"),
         F.col("ETHNIC"),
         F.col("COUNTRY"),
@@ -60,11 +179,6 @@ def process_demographics():
         F.col("ARMCD"),
         F.col("RFSTDTC"),
         F.col("RFENDTC")
-    ).filter(
-        # Basic validation
-        F.col("USUBJID").isNotNull() &
-        F.col("AGE").between(0, 120) &
-        F.col("SEX").isin("M", "F", "U")
     ).withColumn(
         "PROCESSING_TS", F.current_timestamp()
     ).withColumn(
@@ -72,21 +186,18 @@ def process_demographics():
     )
     
     # Write to Silver
-    output_path = f"{SILVER_PATH}dm/"
-    dm_clean.write.mode("overwrite").partitionBy("PROCESSING_DATE").parquet(output_path)
+    dm_count = write_silver(dm_clean, "dm", single_file=True)
     
-    print(f"DM: Processed {dm_clean.count()} records")
-    return dm_clean.count()
+    print(f"DM: Processed {dm_count} records")
+    return dm_count
 
 def process_adverse_events():
     """Process AE (Adverse Events) domain."""
     print("Processing Adverse Events (AE)...")
     
-    ae_path = f"{BRONZE_PATH}synthetic/dm/"  # AE data location
-    
     try:
         # Try to read AE if exists
-        df = spark.read.parquet(ae_path.replace("/dm/", "/ae/"))
+        df = read_bronze("ae")
         
         ae_clean = df.select(
             F.col("STUDYID"),
@@ -111,11 +222,10 @@ def process_adverse_events():
             "PROCESSING_DATE", F.current_date()
         )
         
-        output_path = f"{SILVER_PATH}ae/"
-        ae_clean.write.mode("overwrite").partitionBy("PROCESSING_DATE").parquet(output_path)
+        ae_count = write_silver(ae_clean, "ae")
         
-        print(f"AE: Processed {ae_clean.count()} records")
-        return ae_clean.count()
+        print(f"AE: Processed {ae_count} records")
+        return ae_count
     except Exception as e:
         print(f"AE processing skipped: {e}")
         return 0
@@ -125,8 +235,7 @@ def process_vital_signs():
     print("Processing Vital Signs (VS)...")
     
     try:
-        vs_path = f"{BRONZE_PATH}synthetic/dm/".replace("/dm/", "/vs/")
-        df = spark.read.parquet(vs_path)
+        df = read_bronze("vs")
         
         vs_clean = df.select(
             F.col("STUDYID"),
@@ -151,11 +260,10 @@ def process_vital_signs():
             "PROCESSING_DATE", F.current_date()
         )
         
-        output_path = f"{SILVER_PATH}vs/"
-        vs_clean.write.mode("overwrite").partitionBy("PROCESSING_DATE").parquet(output_path)
+        vs_count = write_silver(vs_clean, "vs")
         
-        print(f"VS: Processed {vs_clean.count()} records")
-        return vs_clean.count()
+        print(f"VS: Processed {vs_count} records")
+        return vs_count
     except Exception as e:
         print(f"VS processing skipped: {e}")
         return 0
@@ -165,8 +273,7 @@ def process_lab_results():
     print("Processing Lab Results (LB)...")
     
     try:
-        lb_path = f"{BRONZE_PATH}synthetic/dm/".replace("/dm/", "/lb/")
-        df = spark.read.parquet(lb_path)
+        df = read_bronze("lb")
         
         lb_clean = df.select(
             F.col("STUDYID"),
@@ -193,20 +300,50 @@ def process_lab_results():
             "PROCESSING_DATE", F.current_date()
         )
         
-        output_path = f"{SILVER_PATH}lb/"
-        lb_clean.write.mode("overwrite").partitionBy("PROCESSING_DATE").parquet(output_path)
+        lb_count = write_silver(lb_clean, "lb")
         
-        print(f"LB: Processed {lb_clean.count()} records")
-        return lb_clean.count()
+        print(f"LB: Processed {lb_count} records")
+        return lb_count
     except Exception as e:
         print(f"LB processing skipped: {e}")
         return 0
 
 def write_job_metrics(metrics):
-    """Write job metrics to S3."""
-    metrics_df = spark.createDataFrame([metrics])
-    metrics_path = f"s3://{DATA_BUCKET}/metadata/quality/bronze_to_silver/"
-    metrics_df.write.mode("append").json(metrics_path)
+    """
+    Append job metrics to the day's run log in S3.
+    
+    Runs are rolled up into one JSON Lines object per run date instead of one
+    tiny file per run, so the metrics prefix grows by one object a day. The
+    read-modify-write is safe because the job allows one concurrent run.
+    """
+    run_date = metrics["run_timestamp"][:10]
+    metrics_key = f"metadata/quality/bronze_to_silver/run_date={run_date}/runs.jsonl"
+    
+    try:
+        existing = s3_client.get_object(Bucket=DATA_BUCKET, Key=metrics_key)["Body"].read()
+    except ClientError as e:
+        if e.response["Error"]["Code"] not in ("NoSuchKey", "404"):
+            raise
+        existing = b""
+    
+    s3_client.put_object(
+        Bucket=DATA_BUCKET,
+        Key=metrics_key,
+        Body=existing + json.dumps(metrics).encode() + b"\n",
+        ContentType="application/x-ndjson"
+    )
+
+DOMAIN_PROCESSORS = {
+    "dm": process_demographics,
+    "ae": process_adverse_events,
+    "vs": process_vital_signs,
+    "lb": process_lab_results
+}
+
+def run_in_pool(domain, processor):
+    """Run a domain processor in its own FAIR scheduler pool."""
+    sc.setLocalProperty("spark.scheduler.pool", domain)
+    return processor()
 
 # Main execution
 if __name__ == "__main__":
@@ -217,13 +354,21 @@ if __name__ == "__main__":
     metrics = {
         "job_name": args['JOB_NAME'],
         "run_timestamp": datetime.now().isoformat(),
-        "environment": ENVIRONMENT,
-        "dm_records": process_demographics(),
-        "ae_records": process_adverse_events(),
-        "vs_records": process_vital_signs(),
-        "lb_records": process_lab_results()
+        "environment": ENVIRONMENT
     }
     
+    # Domains read and write disjoint prefixes; submit all of them before
+    # waiting on any so no domain blocks the others from starting
+    with ThreadPoolExecutor(max_workers=len(DOMAIN_PROCESSORS)) as executor:
+        futures = {
+            domain: executor.submit(run_in_pool, domain, processor)
+            for domain, processor in DOMAIN_PROCESSORS.items()
+        }
+        metrics.update({
+            f"{domain}_records": future.result()
+            for domain, future in futures.items()
+        })
+    
     write_job_metrics(metrics)
     
     print(f"ETL Complete - {datetime.now()}")
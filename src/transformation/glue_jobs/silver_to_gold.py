@@ -6,23 +6,48 @@ Creates dimensional model with fact and dimension tables optimized for querying.
 """
 
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 from awsglue.context import GlueContext
 from awsglue.job import Job
 from awsglue.utils import getResolvedOptions
+from pyspark.conf import SparkConf
 from pyspark.context import SparkContext
 from pyspark.sql import functions as F
 from pyspark.sql.window import Window
+from pyspark.storagelevel import StorageLevel
+
+try:
+    from pyspark.sql import Observation
+except ImportError:  # Spark < 3.3 (Glue 3.0 and earlier)
+    Observation = None
 
 # Initialize Glue context
 args = getResolvedOptions(sys.argv, ['JOB_NAME', 'DATA_BUCKET', 'ENVIRONMENT'])
-sc = SparkContext()
+# FAIR scheduling lets the independent fact builds share the cluster
+sc = SparkContext(conf=SparkConf().set("spark.scheduler.mode", "FAIR"))
 glueContext = GlueContext(sc)
 spark = glueContext.spark_session
 job = Job(glueContext)
 job.init(args['JOB_NAME'], args)
 
+# The default fact joins are explicitly broadcast and never shuffle, so AQE
+# skew splitting only reaches shuffled joins: in practice the opt-in salted
+# AE join (SALT_AE_JOIN), where it can still split an oversized partition
+spark.conf.set("spark.sql.adaptive.enabled", "true")
+spark.conf.set("spark.sql.adaptive.skewJoin.enabled", "true")
+
+# Parquet scans: vectorized reads in larger batches, with Silver filters and
+# min/max/count aggregates pushed down to the footers
+spark.conf.set("spark.sql.parquet.enableVectorizedReader", "true")
+spark.conf.set("spark.sql.parquet.columnarReaderBatchSize", "8192")
+spark.conf.set("spark.sql.parquet.filterPushdown", "true")
+spark.conf.set("spark.sql.parquet.aggregatePushdown", "true")
+
+# Gold files: zstd, as for Silver
+spark.conf.set("spark.sql.parquet.compression.codec", "zstd")
+
 # Configuration
 DATA_BUCKET = args['DATA_BUCKET']
 ENVIRONMENT = args['ENVIRONMENT']
@@ -30,18 +55,159 @@ SILVER_PATH = f"s3://{DATA_BUCKET}/silver/"
 GOLD_PATH = f"s3://{DATA_BUCKET}/gold/"
 
 
-def create_dim_subject():
-    """Create subject dimension table."""
+def optional_flag(name, default):
+    """Read an optional true/false job argument (--NAME)."""
+    if f"--{name}" not in sys.argv:
+        return default
+    return getResolvedOptions(sys.argv, [name])[name].lower() == "true"
+
+
+# Size small Gold outputs explicitly instead of inheriting the shuffle
+# partition count (one near-empty file per partition)
+REPARTITION_OUTPUTS = optional_flag("REPARTITION_GOLD_OUTPUTS", True)
+ROWS_PER_DIM_FILE = 1_000_000
+
+# Salted shuffle join for AE, for when a few subjects carry a large share of
+# the events and the subject lookup is too big to broadcast. Off by default;
+# enable with --SALT_AE_JOIN true
+SALT_AE_JOIN = optional_flag("SALT_AE_JOIN", False)
+SALT_BUCKETS = 16
+
+# Vital signs are recorded to at most one decimal place, so float32 holds
+# them exactly enough at half the bytes. Lab values span many orders of
+# magnitude and stay double unless --LAB_VALUES_FLOAT32 true is passed
+LAB_VALUE_TYPE = "float" if optional_flag("LAB_VALUES_FLOAT32", False) else "double"
+
+
+# Hive-style partition columns; consumers filter on study and event year
+FACT_PARTITION_COLUMNS = ("study_id", "year")
+
+FACT_BLOOM_FILTER_COLUMNS = ("usubjid",)
+
+# Fact keys carry subject_key in the high 32 bits and the row's position
+# within its subject in the low 32
+FACT_KEY_SUBJECT_SHIFT = 2 ** 32
+
+# Silver columns each Gold builder consumes
+DM_COLUMNS = (
+    "USUBJID", "STUDYID", "SUBJID", "SITEID", "AGE", "SEX", "RACE", "ETHNIC",
+    "COUNTRY", "ARM", "ARMCD", "RFSTDTC", "RFENDTC"
+)
+AE_COLUMNS = (
+    "STUDYID", "USUBJID", "AESEQ", "AETERM", "AEDECOD", "AEBODSYS", "AESEV", "AESER",
+    "AEREL", "AEOUT", "AESTDTC", "AEENDTC"
+)
+VS_COLUMNS = (
+    "STUDYID", "USUBJID", "VSSEQ", "VSTESTCD", "VSTEST", "VSSTRESN", "VSSTRESU",
+    "VSNRIND", "VISITNUM", "VISIT", "VSDTC"
+)
+LB_COLUMNS = (
+    "STUDYID", "USUBJID", "LBSEQ", "LBTESTCD", "LBTEST", "LBSTRESN", "LBSTRESU",
+    "LBNRIND", "LBORNRLO", "LBORNRHI", "VISITNUM", "VISIT", "LBDTC"
+)
+
+
+def read_silver(domain, columns):
+    """
+    Read a Silver domain projected to the given columns.
+    
+    Selecting straight off the scan keeps the Parquet reader to those column
+    chunks, whatever the builder does with the DataFrame afterwards.
+    """
+    return spark.read.parquet(f"{SILVER_PATH}{domain}/").select(*columns)
+
+
+def write_gold(df, table, num_files=None, partition_by=(), sort_by=(),
+               bloom_filter_columns=()):
+    """
+    Write a Gold table and return its row count (observed during the write).
+    
+    Optionally repartitions to num_files, partitions by and sorts on the
+    given columns, and adds Parquet bloom filters.
+    """
+    output_path = f"{GOLD_PATH}{table}/"
+    
+    if num_files is not None and REPARTITION_OUTPUTS:
+        df = df.repartition(num_files)
+    
+    observation = None
+    if Observation is not None:
+        observation = Observation(f"{table}_rows")
+        df = df.observe(observation, F.count(F.lit(1)).alias("rows"))
+    
+    if sort_by:
+        df = df.sortWithinPartitions(*partition_by, *sort_by)
+    
+    writer = df.write.mode("overwrite")
+    if partition_by:
+        writer = writer.partitionBy(*partition_by)
+    for column in bloom_filter_columns:
+        writer = writer.option(f"parquet.bloom.filter.enabled#{column}", "true")
+    writer.parquet(output_path)
+    
+    if observation is None:
+        # Counting the files just written needs only their row-group
+        # metadata; df.count() would re-run the whole plan from Silver
+        return spark.read.parquet(output_path).count()
+    return observation.get["rows"]
+
+
+def create_dim_site(dm, etl_ts):
+    """Create site dimension table from Silver DM rows; returns it read back from Gold."""
+    print("Creating dim_site...")
+    
+    dim_site = dm.select(
+        F.col("SITEID").alias("site_id"),
+        F.col("COUNTRY").alias("country")
+    ).dropDuplicates().withColumn(
+        "site_key",
+        F.row_number().over(Window.orderBy("site_id", "country")).cast("int")
+    ).select(
+        "site_key",
+        "site_id", 
+        "country",
+        etl_ts.alias("etl_timestamp")
+    )
+    
+    row_count = write_gold(dim_site, "dim_site", num_files=1)
+    print(f"dim_site: {row_count} records")
+    return spark.read.parquet(f"{GOLD_PATH}dim_site/")
+
+
+def create_dim_subject(etl_ts):
+    """
+    Create subject dimension table (and dim_site from the same DM rows).
+    
+    Returns the table as read back from Gold.
+    """
     print("Creating dim_subject...")
     
-    dm = spark.read.parquet(f"{SILVER_PATH}dm/")
+    dm_rows = read_silver("dm", DM_COLUMNS).dropDuplicates(["USUBJID"]).persist(
+        StorageLevel.MEMORY_AND_DISK
+    )
+    
+    site_keys = F.broadcast(create_dim_site(dm_rows, etl_ts).select(
+        "site_key",
+        F.col("site_id").alias("key_site_id"),
+        F.col("country").alias("key_country")
+    ))
+    dm = dm_rows.join(
+        site_keys,
+        F.col("SITEID").eqNullSafe(F.col("key_site_id")) &
+        F.col("COUNTRY").eqNullSafe(F.col("key_country")),
+        "left"
+    )
+    
+    # Unpartitioned window: a single task, which is fine at subject scale
+    subject_order = Window.orderBy("USUBJID")
     
     dim_subject = dm.select(
-        F.monotonically_increasing_id().alias("subject_key"),
+        F.row_number().over(subject_order).cast("int").alias("subject_key"),
         F.col("USUBJID").alias("usubjid"),
         F.col("STUDYID").alias("study_id"),
         F.col("SUBJID").alias("subject_id"),
         F.col("SITEID").alias("site_id"),
+        F.col("site_key"),
         F.col("AGE").alias("age"),
         F.col("SEX").alias("sex"),
         F.col("RACE").alias("race"),
@@ -51,49 +217,97 @@ def create_dim_subject():
         F.col("ARMCD").alias("treatment_arm_code"),
         F.to_date(F.col("RFSTDTC")).alias("enrollment_date"),
         F.to_date(F.col("RFENDTC")).alias("end_date"),
-        F.current_timestamp().alias("etl_timestamp")
-    ).dropDuplicates(["usubjid"])
+        etl_ts.alias("etl_timestamp")
+    ).persist(StorageLevel.MEMORY_AND_DISK)
+    
+    # Materializes the cache and sizes the output at ~1M subjects per file
+    subject_count = dim_subject.count()
+    row_count = write_gold(
+        dim_subject, "dim_subject",
+        num_files=max(1, subject_count // ROWS_PER_DIM_FILE),
+        partition_by=("study_id",)
+    )
+    print(f"dim_subject: {row_count} records")
     
-    dim_subject.write.mode("overwrite").parquet(f"{GOLD_PATH}dim_subject/")
-    print(f"dim_subject: {dim_subject.count()} records")
-    return dim_subject
+    dim_subject.unpersist()
+    dm_rows.unpersist()
+    return spark.read.parquet(f"{GOLD_PATH}dim_subject/")
 
 
-def create_dim_site(dim_subject):
-    """Create site dimension table."""
-    print("Creating dim_site...")
+def subject_key_map(dim_subject):
+    """
+    Broadcast the (subject_key, usubjid) lookup used by the fact joins.
     
-    dim_site = dim_subject.select(
-        F.col("site_id"),
-        F.col("country")
-    ).dropDuplicates().withColumn(
-        "site_key", F.monotonically_increasing_id()
-    ).select(
-        "site_key",
-        "site_id", 
-        "country",
-        F.current_timestamp().alias("etl_timestamp")
-    )
+    Only the two join columns are shipped to executors, and the key side is
+    an int32; usubjid is renamed so it cannot collide with the fact table's
+    USUBJID (names are case-insensitive).
+    """
+    return F.broadcast(dim_subject.select(
+        "subject_key",
+        F.col("usubjid").alias("key_usubjid")
+    ))
+
+
+def salted_subject_key_map(dim_subject):
+    """
+    Subject lookup replicated once per salt value, for a salted shuffle join.
     
-    dim_site.write.mode("overwrite").parquet(f"{GOLD_PATH}dim_site/")
-    print(f"dim_site: {dim_site.count()} records")
-    return dim_site
+    Joining on (USUBJID, salt) spreads a hot subject's fact rows over
+    SALT_BUCKETS reducers instead of one. The merge hint keeps the planner
+    from broadcasting the replicated lookup, which would defeat the salting.
+    """
+    return dim_subject.select(
+        "subject_key",
+        F.col("usubjid").alias("key_usubjid"),
+        F.explode(F.sequence(F.lit(0), F.lit(SALT_BUCKETS - 1))).alias("key_salt")
+    ).hint("merge")
 
 
-def create_fact_adverse_events(dim_subject):
+def fact_key(order_columns):
+    """
+    Unique, deterministic fact key: subject_key combined with the row's
+    position among its subject's rows, ordered by every Silver column.
+    
+    Rows whose USUBJID is not in dim_subject have no subject_key and get a
+    null key.
+    """
+    position = F.row_number().over(
+        Window.partitionBy("USUBJID").orderBy(*order_columns)
+    )
+    return F.col("subject_key").cast("long") * FACT_KEY_SUBJECT_SHIFT + position
+
+
+def create_fact_adverse_events(dim_subject, etl_ts):
     """Create adverse events fact table."""
     print("Creating fact_adverse_events...")
     
     try:
-        ae = spark.read.parquet(f"{SILVER_PATH}ae/")
+        # Parse each date string once; duration and partition year reuse it
+        ae = read_silver("ae", AE_COLUMNS).withColumn(
+            "start_date", F.to_date(F.col("AESTDTC"))
+        ).withColumn(
+            "end_date", F.to_date(F.col("AEENDTC"))
+        )
         
-        fact_ae = ae.join(
-            dim_subject.select("subject_key", "usubjid"),
-            ae.USUBJID == dim_subject.usubjid,
-            "left"
-        ).select(
-            F.monotonically_increasing_id().alias("ae_key"),
+        if SALT_AE_JOIN:
+            # Salt from the sequence number rather than rand() so a retried
+            # task routes every row to the same reducer as the first attempt
+            ae = ae.withColumn(
+                "salt", F.pmod(F.coalesce(F.col("AESEQ"), F.lit(0)), F.lit(SALT_BUCKETS))
+            )
+            subject_map = salted_subject_key_map(dim_subject)
+            join_condition = (
+                (F.col("USUBJID") == F.col("key_usubjid")) &
+                (F.col("salt") == F.col("key_salt"))
+            )
+        else:
+            subject_map = subject_key_map(dim_subject)
+            join_condition = F.col("USUBJID") == F.col("key_usubjid")
+        
+        fact_ae = ae.join(subject_map, join_condition, "left").select(
+            fact_key(AE_COLUMNS).alias("ae_key"),
             F.col("subject_key"),
+            F.col("STUDYID").alias("study_id"),
             F.col("USUBJID").alias("usubjid"),
             F.col("AESEQ").alias("ae_sequence"),
             F.col("AETERM").alias("ae_term"),
@@ -103,100 +317,140 @@ def create_fact_adverse_events(dim_subject):
             F.col("AESER").alias("is_serious"),
             F.col("AEREL").alias("relationship"),
             F.col("AEOUT").alias("outcome"),
-            F.to_date(F.col("AESTDTC")).alias("start_date"),
-            F.to_date(F.col("AEENDTC")).alias("end_date"),
-            F.datediff(F.col("AEENDTC"), F.col("AESTDTC")).alias("duration_days"),
-            F.current_timestamp().alias("etl_timestamp")
+            F.col("start_date"),
+            F.col("end_date"),
+            F.datediff(F.col("end_date"), F.col("start_date")).alias("duration_days"),
+            etl_ts.alias("etl_timestamp"),
+            F.year(F.col("start_date")).alias("year")
         )
         
-        fact_ae.write.mode("overwrite").parquet(f"{GOLD_PATH}fact_adverse_events/")
-        print(f"fact_adverse_events: {fact_ae.count()} records")
+        row_count = write_gold(
+            fact_ae, "fact_adverse_events",
+            partition_by=FACT_PARTITION_COLUMNS,
+            sort_by=("subject_key", "start_date"),
+            bloom_filter_columns=FACT_BLOOM_FILTER_COLUMNS
+        )
+        print(f"fact_adverse_events: {row_count} records")
     except Exception as e:
         print(f"fact_adverse_events skipped: {e}")
 
 
-def create_fact_vital_signs(dim_subject):
+def create_fact_vital_signs(dim_subject, etl_ts):
     """Create vital signs fact table."""
     print("Creating fact_vital_signs...")
     
     try:
-        vs = spark.read.parquet(f"{SILVER_PATH}vs/")
+        vs = read_silver("vs", VS_COLUMNS).withColumn(
+            "measurement_date", F.to_date(F.col("VSDTC"))
+        )
         
         fact_vs = vs.join(
-            dim_subject.select("subject_key", "usubjid"),
-            vs.USUBJID == dim_subject.usubjid,
+            subject_key_map(dim_subject),
+            F.col("USUBJID") == F.col("key_usubjid"),
             "left"
         ).select(
-            F.monotonically_increasing_id().alias("vs_key"),
+            fact_key(VS_COLUMNS).alias("vs_key"),
             F.col("subject_key"),
+            F.col("STUDYID").alias("study_id"),
             F.col("USUBJID").alias("usubjid"),
             F.col("VSTESTCD").alias("test_code"),
             F.col("VSTEST").alias("test_name"),
-            F.col("VSSTRESN").alias("result_value"),
+            F.col("VSSTRESN").cast("float").alias("result_value"),
             F.col("VSSTRESU").alias("result_unit"),
             F.col("VSNRIND").alias("normal_range_indicator"),
             F.col("VISITNUM").alias("visit_number"),
             F.col("VISIT").alias("visit_name"),
-            F.to_date(F.col("VSDTC")).alias("measurement_date"),
-            F.current_timestamp().alias("etl_timestamp")
+            F.col("measurement_date"),
+            etl_ts.alias("etl_timestamp"),
+            F.year(F.col("measurement_date")).alias("year")
         )
         
-        fact_vs.write.mode("overwrite").parquet(f"{GOLD_PATH}fact_vital_signs/")
-        print(f"fact_vital_signs: {fact_vs.count()} records")
+        row_count = write_gold(
+            fact_vs, "fact_vital_signs",
+            partition_by=FACT_PARTITION_COLUMNS,
+            sort_by=("subject_key", "measurement_date"),
+            bloom_filter_columns=FACT_BLOOM_FILTER_COLUMNS
+        )
+        print(f"fact_vital_signs: {row_count} records")
     except Exception as e:
         print(f"fact_vital_signs skipped: {e}")
 
 
-def create_fact_lab_results(dim_subject):
+def create_fact_lab_results(dim_subject, etl_ts):
     """Create lab results fact table."""
     print("Creating fact_lab_results...")
     
     try:
-        lb = spark.read.parquet(f"{SILVER_PATH}lb/")
+        lb = read_silver("lb", LB_COLUMNS).withColumn(
+            "collection_date", F.to_date(F.col("LBDTC"))
+        )
         
         fact_lb = lb.join(
-            dim_subject.select("subject_key", "usubjid"),
-            lb.USUBJID == dim_subject.usubjid,
+            subject_key_map(dim_subject),
+            F.col("USUBJID") == F.col("key_usubjid"),
             "left"
         ).select(
-            F.monotonically_increasing_id().alias("lb_key"),
+            fact_key(LB_COLUMNS).alias("lb_key"),
             F.col("subject_key"),
+            F.col("STUDYID").alias("study_id"),
             F.col("USUBJID").alias("usubjid"),
             F.col("LBTESTCD").alias("test_code"),
             F.col("LBTEST").alias("test_name"),
-            F.col("LBSTRESN").alias("result_value"),
+            F.col("LBSTRESN").cast(LAB_VALUE_TYPE).alias("result_value"),
             F.col("LBSTRESU").alias("result_unit"),
             F.col("LBNRIND").alias("normal_range_indicator"),
-            F.col("LBORNRLO").alias("normal_range_low"),
-            F.col("LBORNRHI").alias("normal_range_high"),
+            F.col("LBORNRLO").cast(LAB_VALUE_TYPE).alias("normal_range_low"),
+            F.col("LBORNRHI").cast(LAB_VALUE_TYPE).alias("normal_range_high"),
             F.col("VISITNUM").alias("visit_number"),
             F.col("VISIT").alias("visit_name"),
-            F.to_date(F.col("LBDTC")).alias("collection_date"),
-            F.current_timestamp().alias("etl_timestamp")
+            F.col("collection_date"),
+            etl_ts.alias("etl_timestamp"),
+            F.year(F.col("collection_date")).alias("year")
         )
         
-        fact_lb.write.mode("overwrite").parquet(f"{GOLD_PATH}fact_lab_results/")
-        print(f"fact_lab_results: {fact_lb.count()} records")
+        row_count = write_gold(
+            fact_lb, "fact_lab_results",
+            partition_by=FACT_PARTITION_COLUMNS,
+            sort_by=("subject_key", "collection_date"),
+            bloom_filter_columns=FACT_BLOOM_FILTER_COLUMNS
+        )
+        print(f"fact_lab_results: {row_count} records")
     except Exception as e:
         print(f"fact_lab_results skipped: {e}")
 
 
-def create_summary_tables(dim_subject):
+def create_summary_tables(dim_subject, etl_ts):
     """Create pre-aggregated summary tables."""
     print("Creating summary tables...")
     
-    # Subject summary by site and treatment arm
-    subject_summary = dim_subject.groupBy(
+    # Subject summary by site and treatment arm, with the per-site, per-arm
+    # and overall totals from the same pass. grouping_id marks the grain:
+    # 0 = site x arm, 1 = site, 2 = arm, 3 = all subjects
+    subject_summary = dim_subject.cube(
         "site_id", "treatment_arm"
     ).agg(
+        F.grouping_id().alias("grouping_id"),
         F.count("*").alias("subject_count"),
         F.avg("age").alias("avg_age"),
         F.min("age").alias("min_age"),
         F.max("age").alias("max_age")
-    ).withColumn("etl_timestamp", F.current_timestamp())
+    ).withColumn("etl_timestamp", etl_ts)
     
-    subject_summary.write.mode("overwrite").parquet(f"{GOLD_PATH}summary_subjects_by_site/")
-    print(f"summary_subjects_by_site: {subject_summary.count()} records")
+    row_count = write_gold(subject_summary, "summary_subjects_by_site", num_files=1)
+    print(f"summary_subjects_by_site: {row_count} records")
+
+
+FACT_BUILDERS = {
+    "fact_adverse_events": create_fact_adverse_events,
+    "fact_vital_signs": create_fact_vital_signs,
+    "fact_lab_results": create_fact_lab_results,
+}
+
+
+def run_in_pool(table, builder, dim_subject, etl_ts):
+    """Run a fact builder in its own FAIR scheduler pool."""
+    sc.setLocalProperty("spark.scheduler.pool", table)
+    return builder(dim_subject, etl_ts)
 
 
 # Main execution
@@ -205,17 +459,25 @@ if __name__ == "__main__":
     print(f"Data Bucket: {DATA_BUCKET}")
     print(f"Environment: {ENVIRONMENT}")
     
+    # One ETL timestamp for every Gold table written by this run
+    etl_ts = F.lit(datetime.now())
+    
     # Create dimensions first
-    dim_subject = create_dim_subject()
-    dim_site = create_dim_site(dim_subject)
+    dim_subject = create_dim_subject(etl_ts)
     
-    # Create fact tables
-    create_fact_adverse_events(dim_subject)
-    create_fact_vital_signs(dim_subject)
-    create_fact_lab_results(dim_subject)
+    # Fact tables read disjoint Silver domains and share only the written
+    # dim_subject; build them concurrently so one table's S3 I/O overlaps
+    # another's compute
+    with ThreadPoolExecutor(max_workers=len(FACT_BUILDERS)) as executor:
+        futures = [
+            executor.submit(run_in_pool, table, builder, dim_subject, etl_ts)
+            for table, builder in FACT_BUILDERS.items()
+        ]
+        for future in futures:
+            future.result()
     
     # Create summaries
-    create_summary_tables(dim_subject)
+    create_summary_tables(dim_subject, etl_ts)
     
     print(f"ETL Complete - {datetime.now()}")
     job.commit()